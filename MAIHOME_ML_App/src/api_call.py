@@ -4,6 +4,7 @@ from zoneinfo import ZoneInfo
 import os
 import pandas as pd
 import json
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError, Timeout, RequestException
 
 #Set the environment variable "CALCULUS_API_KEY ' to your token and restart the device
@@ -14,7 +15,54 @@ headers = {
 
 base_url = 'https://api.calculus.group/v3'
 
-def query_endpoint(endpoint, header, assetid=None, start_time=None, end_time=None, dry_run=True,timeout_seconds = 100):
+def create_session(pool_size=10):
+    """
+    Create a requests session with a connection pool, reused across API calls.
+
+    Parameters:
+        pool_size (int): Maximum number of pooled connections to the API host.
+
+    Returns:
+        requests.Session: A session with the Calculus API key header set.
+    """
+    session = requests.Session()
+    session.headers.update(headers)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def build_url(endpoint, assetid=None, start_time=None, end_time=None):
+    """Builds the API URL for an endpoint, optionally for one asset and time range."""
+    url = f"{base_url}/assets"
+
+    if assetid is not None:
+        url += f"/{assetid}"
+
+    url += f"/{endpoint}"
+
+    if start_time is not None and end_time is not None:
+        start_unix = datetime_to_unix(start_time)
+        end_unix = datetime_to_unix(end_time)
+        url += f"?unixTimestampStart={start_unix}&unixTimestampEnd={end_unix}"
+    return url
+
+def fetch_endpoint(session, endpoint, assetid=None, start_time=None, end_time=None, timeout_seconds=100):
+    """
+    Queries the specified API endpoint over a shared session.
+
+    Unlike query_endpoint, failures are not hidden: requests exceptions
+    (Timeout, HTTPError, ...) propagate so callers can retry or report them.
+
+    Returns:
+        dict: The JSON response from the API.
+    """
+    url = build_url(endpoint, assetid, start_time, end_time)
+    response = session.get(url, timeout=timeout_seconds)
+    response.raise_for_status()
+    return response.json()
+
+def query_endpoint(endpoint, header, assetid=None, start_time=None, end_time=None, dry_run=True,timeout_seconds = 100, session=None):
     """
     Queries the specified API endpoint.
 
@@ -28,25 +76,20 @@ def query_endpoint(endpoint, header, assetid=None, start_time=None, end_time=Non
             Should be a timezone-aware datetime object.
         dry_run (bool, optional): If True, only prints the URL without making the request. 
             Default is False.
+        session (requests.Session, optional): Session to reuse pooled connections,
+            e.g. from create_session().
 
     Returns:
         dict or None: The JSON response from the API if the request is successful,
             None if there is an error or if dry_run is True.
     """
-    url = f"{base_url}/assets"
-    
-    if assetid is not None:
-        url += f"/{assetid}"
-    
-    url += f"/{endpoint}"
-    
-    if start_time is not None and end_time is not None:
-        start_unix = datetime_to_unix(start_time)
-        end_unix = datetime_to_unix(end_time)
-        url += f"?unixTimestampStart={start_unix}&unixTimestampEnd={end_unix}"
+    url = build_url(endpoint, assetid, start_time, end_time)
     
     try:
-        response = requests.get(url, headers=headers, timeout=timeout_seconds)
+        if session is not None:
+            response = session.get(url, timeout=timeout_seconds)
+        else:
+            response = requests.get(url, headers=headers, timeout=timeout_seconds)
         response.raise_for_status()  # Raises HTTPError if response status code is not 2xx
         return response.json()
     except Timeout:
@@ -0,0 +1,247 @@
+"""
+Bulk historical export from the Calculus API.
+
+Splits [start, end] into time chunks per asset, fetches the chunks concurrently
+over one pooled session and writes every chunk as a Parquet file partitioned by
+asset:
+
+    <out_dir>/asset_id=<id>/<start>_<end>.parquet
+
+Completed chunks are recorded in <out_dir>/_completed.jsonl, so re-running the
+same command after an interruption only fetches what is still missing.
+
+Columns carry the same asset-name prefix as the ML server's live fetch
+(e.g. WONING_16__Living_temperature). --merged additionally joins all
+partitions into one Timestamp-indexed file that can be passed to
+`python -m app.ml.train --input` or `python -m app.ml.backfill --input`.
+
+Usage:
+    python src/export.py --assets data/assets.json --start 2025-01-01 --end 2025-06-30 --out data/export
+    python src/export.py --assets data/assets.json --start 2025-01-01 --end 2025-06-30 --out data/export \
+        --merged data/history.parquet
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+from requests.exceptions import HTTPError, RequestException
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from api_call import create_session, fetch_endpoint, extract_reading_data, load_assets_from_json
+
+CHECKPOINT_FILE = '_completed.jsonl'
+
+
+def split_range(start_time, end_time, chunk):
+    """
+    Split [start_time, end_time) into consecutive windows of at most `chunk`.
+
+    Returns:
+        list of (datetime, datetime) tuples.
+    """
+    chunks = []
+    chunk_start = start_time
+    while chunk_start < end_time:
+        chunk_end = min(chunk_start + chunk, end_time)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end
+    return chunks
+
+
+def chunk_key(asset_id, chunk_start, chunk_end):
+    return f"{asset_id}|{int(chunk_start.timestamp())}|{int(chunk_end.timestamp())}"
+
+
+def load_checkpoint(out_dir):
+    """Returns the set of chunk keys that were already exported to out_dir."""
+    path = os.path.join(out_dir, CHECKPOINT_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as file:
+        return {json.loads(line)['key'] for line in file if line.strip()}
+
+
+def column_prefix(asset_name):
+    """Asset-name prefix of the sensor columns, as used by the ML server."""
+    return re.sub(r'[^\w\s]', '', asset_name).strip().replace(' ', '_')
+
+
+def readings_to_frame(data, asset):
+    """Flatten an aggregateseries response into one row per timestamp with prefixed columns."""
+    reading_data = extract_reading_data(data, asset['id'])
+    if not reading_data:
+        return None
+    df = pd.DataFrame(reading_data)
+    df = df.groupby('Timestamp').agg('first').reset_index()
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], utc=True)
+    df = df.drop(columns=[c for c in ['SensorID', 'SensorType'] if c in df.columns])
+    prefix = column_prefix(asset.get('name', str(asset['id'])))
+    return df.rename(columns={c: f"{prefix}_{c}" for c in df.columns if c != 'Timestamp'})
+
+
+def fetch_chunk(session, asset, chunk_start, chunk_end, out_dir, retries=3, timeout_seconds=100):
+    """
+    Fetch one asset/time chunk and write it to its partition directory.
+
+    Timeouts, connection errors, 429 and 5xx responses are retried with
+    exponential backoff; other HTTP errors are raised immediately.
+
+    Returns:
+        int: The number of rows written (0 if the chunk had no data).
+    """
+    asset_id = asset['id']
+    for attempt in range(retries + 1):
+        try:
+            data = fetch_endpoint(session, 'aggregateseries', asset_id, chunk_start, chunk_end,
+                                  timeout_seconds=timeout_seconds)
+            break
+        except HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if attempt == retries or (status is not None and status != 429 and status < 500):
+                raise
+        except RequestException:
+            if attempt == retries:
+                raise
+        time.sleep(2 ** attempt)
+
+    df = readings_to_frame(data, asset)
+    if df is None or df.empty:
+        return 0
+
+    partition = os.path.join(out_dir, f"asset_id={asset_id}")
+    os.makedirs(partition, exist_ok=True)
+    name = f"{chunk_start:%Y%m%dT%H%M%S}_{chunk_end:%Y%m%dT%H%M%S}.parquet"
+    tmp_path = os.path.join(partition, f".{name}.tmp")
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, os.path.join(partition, name))
+    return len(df)
+
+
+def export_history(assets, start_time, end_time, out_dir, chunk_days=7, max_workers=8, retries=3):
+    """
+    Export the history of all assets between start_time and end_time.
+
+    Parameters:
+        assets (list): Asset dicts with at least an 'id' (see load_assets_from_json).
+        start_time (datetime): Timezone-aware start of the export.
+        end_time (datetime): Timezone-aware end of the export.
+        out_dir (str): Output directory for the partitioned Parquet files.
+        chunk_days (int): Length of one request window in days.
+        max_workers (int): Maximum number of concurrent requests.
+        retries (int): Retries per chunk for transient failures.
+
+    Returns:
+        list: (asset_id, chunk_start, chunk_end, error) for every chunk that failed.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    done = load_checkpoint(out_dir)
+
+    todo = [
+        (asset, chunk_start, chunk_end)
+        for asset in assets
+        for chunk_start, chunk_end in split_range(start_time, end_time, timedelta(days=chunk_days))
+        if chunk_key(asset['id'], chunk_start, chunk_end) not in done
+    ]
+    print(f"{len(todo)} chunk(s) to fetch, {len(done)} already done")
+
+    failures = []
+    session = create_session(pool_size=max_workers)
+    checkpoint_path = os.path.join(out_dir, CHECKPOINT_FILE)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool, \
+            open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+        futures = {
+            pool.submit(fetch_chunk, session, asset, chunk_start, chunk_end, out_dir, retries): (asset, chunk_start, chunk_end)
+            for asset, chunk_start, chunk_end in todo
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            asset, chunk_start, chunk_end = futures[future]
+            try:
+                rows = future.result()
+            except Exception as e:
+                failures.append((asset['id'], chunk_start, chunk_end, str(e)))
+                print(f"[{i}/{len(todo)}] {asset.get('name', asset['id'])} {chunk_start:%Y-%m-%d}: failed ({e})")
+                continue
+            # Only the main thread writes the checkpoint, after the chunk file is in place
+            key = chunk_key(asset['id'], chunk_start, chunk_end)
+            checkpoint.write(json.dumps({'key': key, 'rows': rows}) + '\n')
+            checkpoint.flush()
+            print(f"[{i}/{len(todo)}] {asset.get('name', asset['id'])} {chunk_start:%Y-%m-%d}: {rows} rows")
+
+    session.close()
+    return failures
+
+
+def merge_export(out_dir, output_path):
+    """
+    Merge all exported partitions into one frame with a Timestamp column and one
+    column per asset sensor, the layout the ML server's fetch_sensor_data produces.
+    Gaps are left empty; the model's preprocessing fills them after resampling.
+
+    Returns:
+        pandas.DataFrame: The merged history, also written to output_path (.parquet or .csv).
+    """
+    merged = None
+    for partition in sorted(os.listdir(out_dir)):
+        path = os.path.join(out_dir, partition)
+        if not partition.startswith('asset_id=') or not os.path.isdir(path):
+            continue
+        files = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.parquet')]
+        if not files:
+            continue
+        asset_df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+        # Adjacent chunks may both contain the reading at their shared boundary
+        asset_df = asset_df.drop_duplicates('Timestamp').sort_values('Timestamp')
+        merged = asset_df if merged is None else pd.merge(merged, asset_df, on='Timestamp', how='outer')
+
+    if merged is None:
+        raise ValueError(f"No exported partitions found in {out_dir}")
+    merged = merged.sort_values('Timestamp').reset_index(drop=True)
+
+    if output_path.endswith('.csv'):
+        merged.to_csv(output_path, index=False)
+    else:
+        merged.to_parquet(output_path, index=False)
+    print(f"Merged {merged.shape[1] - 1} column(s), {len(merged)} rows into {output_path}")
+    return merged
+
+
+def parse_date(value):
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=ZoneInfo('Europe/Amsterdam'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export Calculus sensor history to partitioned Parquet files')
+    parser.add_argument('--assets', required=True, help='JSON file with the asset list')
+    parser.add_argument('--start', required=True, type=parse_date)
+    parser.add_argument('--end', required=True, type=parse_date)
+    parser.add_argument('--out', required=True, help='Output directory')
+    parser.add_argument('--chunk-days', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=8, help='Maximum concurrent requests')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--match', help='Only export assets whose name matches this regex')
+    parser.add_argument('--merged', help='Also merge all partitions into this .parquet/.csv file for training')
+    args = parser.parse_args()
+
+    assets = load_assets_from_json(args.assets)
+    if args.match:
+        assets = [a for a in assets if re.search(args.match, a.get('name', ''))]
+
+    failures = export_history(assets, args.start, args.end, args.out,
+                              chunk_days=args.chunk_days, max_workers=args.workers, retries=args.retries)
+    if failures:
+        print(f"{len(failures)} chunk(s) failed — re-run the same command to retry them")
+        sys.exit(1)
+    if args.merged:
+        merge_export(args.out, args.merged)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionBroadcaster:
+    """Fan new predictions out to server-sent-event subscribers.
+
+    Every prediction is serialized into an SSE frame once, and that same bytes
+    object is queued for each matching subscriber. A slow subscriber whose
+    queue is full loses its oldest frame rather than blocking the publisher.
+    """
+
+    def __init__(self, queue_size: int = 8):
+        self.queue_size = queue_size
+        self._subscribers: dict[asyncio.Queue, str | None] = {}
+        self._latest: dict[str, bytes] = {}
+        self._event_id = 0
+
+    def subscribe(self, house_id: str | None = None) -> asyncio.Queue:
+        """Register a subscriber for one house (or all houses when None).
+
+        The queue is primed with the latest frame of each matching house so a
+        new client does not have to wait for the next cycle.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        for latest_house, frame in self._latest.items():
+            if house_id in (None, latest_house) and not queue.full():
+                queue.put_nowait(frame)
+        self._subscribers[queue] = house_id
+        logger.info("Stream subscriber added (house=%s, total=%d)", house_id, len(self._subscribers))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.pop(queue, None)
+        logger.info("Stream subscriber removed (total=%d)", len(self._subscribers))
+
+    def publish(self, house_id: str, result: dict):
+        self._event_id += 1
+        payload = json.dumps({"house_id": house_id, "prediction": result}, separators=(",", ":"))
+        frame = f"id: {self._event_id}\nevent: prediction\ndata: {payload}\n\n".encode("utf-8")
+        self._latest[house_id] = frame
+
+        for queue, wanted_house in self._subscribers.items():
+            if wanted_house not in (None, house_id):
+                continue
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(frame)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+broadcaster = PredictionBroadcaster()
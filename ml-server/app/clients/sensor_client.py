@@ -1,13 +1,21 @@
+from __future__ import annotations
+
 import asyncio
+import json
 import logging
 import re
 from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING
 from zoneinfo import ZoneInfo
 
 import httpx
-import pandas as pd
 
 from app.config import settings
+from app.ml.accuracy import tracker
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +38,24 @@ ASSETS = [
 ]
 
 
+@lru_cache(maxsize=1)
+def _load_assets_file(path: str) -> dict[str, list[dict]]:
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_assets(house_id: str) -> list[dict]:
+    """Return the Calculus assets of a house (ASSETS_FILE, falling back to ASSETS)."""
+    assets = _load_assets_file(settings.ASSETS_FILE).get(house_id)
+    if assets is not None:
+        return assets
+    if house_id == settings.HOUSE_ID:
+        return ASSETS
+    raise ValueError(f"No assets configured for house {house_id}")
+
+
 def _datetime_to_unix(dt: datetime) -> int:
     """Convert a timezone-aware datetime to a Unix timestamp."""
     dt_utc = dt.astimezone(ZoneInfo("UTC"))
@@ -61,6 +87,8 @@ async def _fetch_asset(
     end_time: datetime,
 ) -> pd.DataFrame | None:
     """Fetch and process data for a single asset."""
+    import pandas as pd
+
     asset_id = asset["id"]
     asset_name = asset["name"]
     clean_prefix = re.sub(r"[^\w\s]", "", asset_name).strip().replace(" ", "_")
@@ -99,15 +127,35 @@ async def _fetch_asset(
     return df
 
 
-async def fetch_sensor_data(hours: int | None = None) -> pd.DataFrame:
-    """Fetch and merge sensor data for all assets from the Calculus API."""
+async def fetch_sensor_data(
+    hours: int | None = None,
+    start_time: datetime | None = None,
+    end_time: datetime | None = None,
+    house_id: str | None = None,
+    fill_gaps: bool = True,
+) -> pd.DataFrame:
+    """Fetch and merge sensor data for all assets of a house from the Calculus API.
+
+    By default the last ``hours`` of data are fetched; pass ``start_time`` and
+    ``end_time`` to fetch an explicit historical range instead. New readings
+    are handed to the accuracy tracker to score earlier forecasts. With
+    ``fill_gaps=False`` missing readings are left as NaN.
+    """
+    import pandas as pd
+
+    if house_id is None:
+        house_id = settings.HOUSE_ID
+
     if hours is None:
         hours = settings.SENSOR_HISTORY_HOURS
 
-    end_time = datetime.now(ZoneInfo("UTC"))
-    start_time = end_time - timedelta(hours=hours)
+    if end_time is None:
+        end_time = datetime.now(ZoneInfo("UTC"))
+    if start_time is None:
+        start_time = end_time - timedelta(hours=hours)
 
-    logger.info("Fetching sensor data from %s to %s...", start_time, end_time)
+    assets = get_assets(house_id)
+    logger.info("Fetching sensor data for %s from %s to %s...", house_id, start_time, end_time)
 
     async with httpx.AsyncClient(
         headers={"CalculusApiKey": settings.CALCULUS_API_KEY},
@@ -115,13 +163,13 @@ async def fetch_sensor_data(hours: int | None = None) -> pd.DataFrame:
     ) as client:
         tasks = [
             _fetch_asset(client, asset, start_time, end_time)
-            for asset in ASSETS
+            for asset in assets
         ]
         results = await asyncio.gather(*tasks)
 
     # Merge all asset DataFrames
     df = pd.DataFrame()
-    for asset, result in zip(ASSETS, results):
+    for asset, result in zip(assets, results):
         if result is None or result.empty:
             continue
         if df.empty:
@@ -131,7 +179,13 @@ async def fetch_sensor_data(hours: int | None = None) -> pd.DataFrame:
 
     if not df.empty:
         df = df.sort_values("Timestamp").reset_index(drop=True)
-        df = df.interpolate(method="linear").ffill().bfill()
+        # Score forecasts on real readings only, before gaps are filled
+        try:
+            tracker.observe(house_id, df)
+        except Exception:
+            logger.exception("Forecast accuracy update for %s failed", house_id)
+        if fill_gaps:
+            df = df.interpolate(method="linear").ffill().bfill()
         logger.info("Sensor data merged: %s", df.shape)
     else:
         logger.warning("No sensor data retrieved")
@@ -1,22 +1,34 @@
+from __future__ import annotations
+
 import logging
+from typing import TYPE_CHECKING
 
 import httpx
-import pandas as pd
 
-from app.config import settings
+from app.config import settings, wait_for_secrets
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
 _client: httpx.AsyncClient | None = None
+_client_base_url: str | None = None
 
 
-def _get_client() -> httpx.AsyncClient:
-    global _client
+async def _get_client() -> httpx.AsyncClient:
+    global _client, _client_base_url
+    # TWIN_SERVER_URL may come from Infisical, so only connect once it is known
+    await wait_for_secrets()
+    if _client is not None and _client_base_url != settings.TWIN_SERVER_URL:
+        logger.info("TWIN_SERVER_URL changed — reconnecting to %s", settings.TWIN_SERVER_URL)
+        await close()
     if _client is None or _client.is_closed:
         _client = httpx.AsyncClient(
             base_url=settings.TWIN_SERVER_URL,
             timeout=30.0,
         )
+        _client_base_url = settings.TWIN_SERVER_URL
     return _client
 
 
@@ -29,6 +41,8 @@ async def close():
 
 async def push_sensor_data(house_id: str, sensor_df: pd.DataFrame) -> dict:
     """Transform sensor DataFrame into room-based JSON and push to the server."""
+    import pandas as pd
+
     if sensor_df.empty:
         logger.warning("Empty sensor DataFrame — skipping push")
         return {}
@@ -80,7 +94,7 @@ async def push_sensor_data(house_id: str, sensor_df: pd.DataFrame) -> dict:
         "rooms": rooms,
     }
 
-    client = _get_client()
+    client = await _get_client()
     try:
         response = await client.post("/api/twin/sensor-data", json=payload)
         response.raise_for_status()
@@ -102,7 +116,7 @@ async def push_prediction(house_id: str, result: dict) -> dict:
         "prediction": result,
     }
 
-    client = _get_client()
+    client = await _get_client()
     try:
         response = await client.post("/api/twin/predictions", json=payload)
         response.raise_for_status()
@@ -1,10 +1,27 @@
+import asyncio
+import json
 import logging
 import os
+import threading
+import time
+from typing import Callable
 
 from pydantic_settings import BaseSettings
 
+from app.startup import timed_phase
+
 logger = logging.getLogger(__name__)
 
+# Keys we set in os.environ from Infisical; only these may be overwritten on
+# refresh, so real environment variables keep taking precedence.
+_injected_keys: set[str] = set()
+_secrets_fetched_at: float | None = None
+_refresh_thread: threading.Thread | None = None
+# Set once settings hold the secrets we will run with: a fresh cache, the
+# first refresh attempt, or straight away when Infisical is not configured.
+_secrets_ready = threading.Event()
+_refresh_listeners: list[Callable[[], None]] = []
+
 
 def _fetch_infisical_secrets() -> dict[str, str]:
     client_id = os.getenv("INFISICAL_CLIENT_ID", "")
@@ -39,28 +56,175 @@ def _fetch_infisical_secrets() -> dict[str, str]:
         return {}
 
 
+def _infisical_configured() -> bool:
+    return all(
+        os.getenv(key)
+        for key in ("INFISICAL_CLIENT_ID", "INFISICAL_CLIENT_SECRET", "INFISICAL_PROJECT_ID")
+    )
+
+
+def _read_secrets_cache() -> tuple[dict[str, str], float] | None:
+    """Return (secrets, fetched_at) from the local cache file, if enabled and present."""
+    path = settings.INFISICAL_CACHE_PATH
+    if not path:
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data["secrets"], float(data["fetched_at"])
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError):
+        logger.warning("Ignoring unreadable secrets cache at %s", path)
+        return None
+
+
+def _write_secrets_cache(secrets: dict[str, str], fetched_at: float):
+    path = settings.INFISICAL_CACHE_PATH
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": fetched_at, "secrets": secrets}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        logger.warning("Could not write secrets cache to %s", path)
+
+
+def _apply_secrets(secrets: dict[str, str]):
+    for key, value in secrets.items():
+        if key not in os.environ or key in _injected_keys:
+            os.environ[key] = value
+            _injected_keys.add(key)
+
+
+def _secrets_stale() -> bool:
+    if _secrets_fetched_at is None:
+        return True
+    return time.time() - _secrets_fetched_at >= settings.INFISICAL_CACHE_TTL_SECONDS
+
+
+def add_refresh_listener(callback: Callable[[], None]):
+    """Call ``callback`` (from the refresh thread) after every settings reload."""
+    _refresh_listeners.append(callback)
+
+
+def refresh_secrets() -> bool:
+    """Fetch secrets from Infisical, update the cache and reload settings."""
+    global _secrets_fetched_at
+    secrets = _fetch_infisical_secrets()
+    if not secrets:
+        return False
+
+    _secrets_fetched_at = time.time()
+    _write_secrets_cache(secrets, _secrets_fetched_at)
+    _apply_secrets(secrets)
+
+    fresh = Settings()
+    for field in Settings.model_fields:
+        setattr(settings, field, getattr(fresh, field))
+    _secrets_ready.set()
+
+    for callback in _refresh_listeners:
+        try:
+            callback()
+        except Exception:
+            logger.exception("Settings refresh listener failed")
+    return True
+
+
+def secrets_ready() -> bool:
+    return _secrets_ready.is_set()
+
+
+async def wait_for_secrets(poll_seconds: float = 0.5):
+    """Wait until settings hold the secrets the server should run with."""
+    while not _secrets_ready.is_set():
+        await asyncio.sleep(poll_seconds)
+
+
+def _refresh_loop():
+    while True:
+        if _secrets_stale() and not refresh_secrets():
+            # Keep serving the cached values and retry a bit later
+            if not _secrets_ready.is_set():
+                logger.warning("Infisical unreachable — starting with cached or environment secrets")
+                _secrets_ready.set()
+            time.sleep(min(60, settings.INFISICAL_CACHE_TTL_SECONDS))
+            continue
+        remaining = settings.INFISICAL_CACHE_TTL_SECONDS - (time.time() - _secrets_fetched_at)
+        time.sleep(max(remaining, 1))
+
+
+def start_secrets_refresh():
+    """Refresh secrets in a daemon thread whenever the cached copy expires."""
+    global _refresh_thread
+    if not _infisical_configured():
+        return
+    if _refresh_thread is not None and _refresh_thread.is_alive():
+        return
+    _refresh_thread = threading.Thread(
+        target=_refresh_loop, name="infisical-refresh", daemon=True
+    )
+    _refresh_thread.start()
+
+
+def get_secrets_status() -> dict:
+    return {
+        "source": "infisical" if _infisical_configured() else "environment",
+        "fetched_at": _secrets_fetched_at,
+        "stale": _secrets_stale() if _infisical_configured() else False,
+        "ready": _secrets_ready.is_set(),
+    }
+
+
 class Settings(BaseSettings):
     PORT: int = 8000
     TWIN_SERVER_URL: str = "http://localhost:3001"
     CALCULUS_API_URL: str = "https://api.calculus.group/v3"
     CALCULUS_API_KEY: str = ""
     HOUSE_ID: str = "woning16"
+    # Comma-separated houses to schedule; defaults to HOUSE_ID alone
+    HOUSE_IDS: str = ""
+    # JSON file mapping house id → list of Calculus assets ({"id", "name"})
+    ASSETS_FILE: str = ""
     PREDICTION_INTERVAL_MINUTES: int = 15
+    PREDICTION_JITTER_SECONDS: int = 0
+    MAX_CONCURRENT_CYCLES: int = 4
     SENSOR_HISTORY_HOURS: int = 24
     MODEL_PATH: str = "model/woning16_model.pth"
+    MODEL_VERSION: str = "v1"
+    MODEL_CACHE_MAX_MB: int = 512
+    MAX_SCENARIOS: int = 500
     LOG_LEVEL: str = "INFO"
     INFISICAL_CLIENT_ID: str = ""
     INFISICAL_CLIENT_SECRET: str = ""
     INFISICAL_PROJECT_ID: str = ""
+    # Opt-in plaintext cache of the Infisical secrets; empty disables it
+    INFISICAL_CACHE_PATH: str = ""
+    # How long fetched secrets count as fresh before they are refreshed
+    INFISICAL_CACHE_TTL_SECONDS: int = 3600
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
-    def __init__(self, **kwargs):
-        infisical_secrets = _fetch_infisical_secrets()
-        for key, value in infisical_secrets.items():
-            if key not in os.environ:
-                os.environ[key] = value
-        super().__init__(**kwargs)
+    @property
+    def house_ids(self) -> list[str]:
+        ids = [h.strip() for h in self.HOUSE_IDS.split(",") if h.strip()]
+        return ids or [self.HOUSE_ID]
 
 
-settings = Settings()
+with timed_phase("config"):
+    # Start from the last cached secrets (any age) so startup never waits on
+    # Infisical; start_secrets_refresh() replaces them once a fetch succeeds.
+    # Until then (or without any cache) the scheduler and twin client wait
+    # for the first refresh attempt via wait_for_secrets().
+    settings = Settings()
+    _cached = _read_secrets_cache()
+    if _cached is not None:
+        _apply_secrets(_cached[0])
+        _secrets_fetched_at = _cached[1]
+        settings = Settings()
+    if not _infisical_configured() or not _secrets_stale():
+        _secrets_ready.set()
@@ -1,14 +1,34 @@
+import asyncio
+import hashlib
+import json
 import logging
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
 
-from app.config import settings
-from app.scheduler import start_scheduler, stop_scheduler, get_status
+from app.broadcast import broadcaster
+from app.config import (
+    settings,
+    start_secrets_refresh,
+    get_secrets_status,
+    secrets_ready,
+    wait_for_secrets,
+)
+from app.scheduler import (
+    STATUS_FIELDS,
+    start_scheduler,
+    stop_scheduler,
+    get_status,
+    get_status_watermark,
+)
 from app.clients import twin_client
 from app.ml import predictor
+from app.ml.accuracy import tracker
+from app.startup import timed_phase, mark_ready, get_startup_report
 
 logging.basicConfig(
     level=settings.LOG_LEVEL,
@@ -17,17 +37,45 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def _start_scheduler_when_ready():
+    logger.info("No fresh secrets cache — scheduler waits for the first refresh")
+    await wait_for_secrets()
+    start_scheduler()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting ML server...")
-    predictor.init(settings.MODEL_PATH)
-    start_scheduler()
+    start_secrets_refresh()
+    with timed_phase("predictor_init"):
+        predictor.init(
+            settings.MODEL_PATH,
+            model_version=settings.MODEL_VERSION,
+            cache_max_bytes=settings.MODEL_CACHE_MAX_MB * 1024**2,
+        )
+    scheduler_task = None
+    if secrets_ready():
+        with timed_phase("scheduler_start"):
+            start_scheduler()
+    else:
+        # Serve from the stale cache right away; jobs only start on fresh settings
+        scheduler_task = asyncio.create_task(_start_scheduler_when_ready())
+    mark_ready()
     yield
     logger.info("Shutting down ML server...")
+    if scheduler_task is not None:
+        scheduler_task.cancel()
     stop_scheduler()
     await twin_client.close()
 
 
+class SettingsCORSMiddleware(CORSMiddleware):
+    """CORS that follows TWIN_SERVER_URL across secrets refreshes."""
+
+    def is_allowed_origin(self, origin: str) -> bool:
+        return origin == settings.TWIN_SERVER_URL or super().is_allowed_origin(origin)
+
+
 app = FastAPI(
     title="MAIHome ML Server",
     description="ML prediction service for the MAIHome digital twin",
@@ -36,9 +84,8 @@ app = FastAPI(
 )
 
 app.add_middleware(
-    CORSMiddleware,
+    SettingsCORSMiddleware,
     allow_origins=[
-        settings.TWIN_SERVER_URL,
         "http://localhost:3000",
         "http://localhost:3001",
         "http://localhost:3002",
@@ -51,14 +98,131 @@ app.add_middleware(
 
 @app.get("/health")
 async def health():
-    status = get_status()
+    status = get_status({"scheduler_running"})
     return {
         "status": "ok",
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "scheduler_running": status["scheduler_running"],
+        "startup": get_startup_report(),
+        "secrets": get_secrets_status(),
     }
 
 
+DEFAULT_STATUS_FIELDS = frozenset(STATUS_FIELDS) - {"last_prediction_result"}
+_status_body_cache: dict = {}
+
+
 @app.get("/api/ml/status")
-async def ml_status():
-    return get_status()
+async def ml_status(request: Request, fields: str | None = None):
+    """Scheduler status; the heavy prediction payload is opt-in via ``fields``.
+
+    ``fields`` is a comma-separated list of status keys, or ``*`` for all of
+    them. Responses carry an ETag and honour ``If-None-Match`` with a 304.
+    """
+    if fields is None:
+        selected = DEFAULT_STATUS_FIELDS
+    elif fields.strip() == "*":
+        selected = frozenset(STATUS_FIELDS)
+    else:
+        selected = frozenset(f.strip() for f in fields.split(",") if f.strip())
+        unknown = selected - set(STATUS_FIELDS)
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Unknown status field(s) {sorted(unknown)}; available: {list(STATUS_FIELDS)}",
+            )
+
+    watermark = get_status_watermark()
+    fingerprint = json.dumps([*watermark, sorted(selected)])
+    etag = '"' + hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+
+    # Serialized bodies stay valid until the status version changes (next cycle)
+    if _status_body_cache.get("watermark") != watermark:
+        _status_body_cache.clear()
+        _status_body_cache["watermark"] = watermark
+    body = _status_body_cache.get(selected)
+    if body is None:
+        body = json.dumps(get_status(set(selected))).encode("utf-8")
+        _status_body_cache[selected] = body
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/ml/metrics")
+async def ml_metrics():
+    return {
+        "model_cache": predictor.cache_stats(),
+        "stream_subscribers": broadcaster.subscriber_count,
+    }
+
+
+STREAM_KEEPALIVE_SECONDS = 15
+
+
+@app.get("/api/ml/stream")
+async def ml_stream(house_id: str | None = None):
+    """Server-sent events: one `prediction` event per completed cycle."""
+    queue = broadcaster.subscribe(house_id)
+
+    async def events():
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield b": keepalive\n\n"
+                    continue
+                yield frame
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/ml/accuracy")
+async def ml_accuracy(house_id: str | None = None):
+    return tracker.summary(house_id)
+
+
+class SetpointScenario(BaseModel):
+    name: str | None = None
+    # Setpoint column (or room temperature column) → constant °C or a trajectory
+    # replacing the last len(values) steps of the input window
+    setpoints: dict[str, float | list[float]] = Field(min_length=1)
+
+
+class ScenarioRequest(BaseModel):
+    scenarios: list[SetpointScenario] = Field(min_length=1)
+
+
+@app.post("/api/ml/houses/{house_id}/scenarios")
+async def ml_scenarios(house_id: str, request: ScenarioRequest):
+    if len(request.scenarios) > settings.MAX_SCENARIOS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.MAX_SCENARIOS} scenarios per request",
+        )
+
+    try:
+        result = predictor.predict_scenarios(
+            house_id, [scenario.setpoints for scenario in request.scenarios]
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    for scenario, scenario_result in zip(request.scenarios, result["scenarios"]):
+        scenario_result["name"] = scenario.name
+    return result
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STEP = timedelta(minutes=10)
+
+
+class _RunningError:
+    """Welford-style running error statistics for every horizon step of one room."""
+
+    def __init__(self, horizon: int):
+        import numpy as np
+
+        self.count = np.zeros(horizon, dtype=np.int64)
+        self.mean = np.zeros(horizon)
+        self.m2 = np.zeros(horizon)
+        self.mean_abs = np.zeros(horizon)
+
+    def update(self, mask: np.ndarray, errors: np.ndarray):
+        """Add one error sample for each horizon step selected by ``mask``."""
+        import numpy as np
+
+        e = errors[mask]
+        self.count[mask] += 1
+        n = self.count[mask]
+        delta = e - self.mean[mask]
+        self.mean[mask] += delta / n
+        self.m2[mask] += delta * (e - self.mean[mask])
+        self.mean_abs[mask] += (np.abs(e) - self.mean_abs[mask]) / n
+
+    def summary(self, offsets: list[int]) -> list[dict]:
+        import numpy as np
+
+        rows = []
+        for i, offset in enumerate(offsets):
+            n = int(self.count[i])
+            if n == 0:
+                rows.append({"offset_min": offset, "n": 0, "mae": None, "bias": None, "rmse": None})
+                continue
+            rmse = float(np.sqrt(self.m2[i] / n + self.mean[i] ** 2))
+            rows.append({
+                "offset_min": offset,
+                "n": n,
+                "mae": round(float(self.mean_abs[i]), 3),
+                "bias": round(float(self.mean[i]), 3),
+                "rmse": round(rmse, 3),
+            })
+        return rows
+
+
+class _PendingForecast:
+    """A forecast whose horizon steps have not all been compared with readings yet."""
+
+    __slots__ = ("base_time", "rooms", "temps", "scored")
+
+    def __init__(self, base_time: datetime, rooms: list[str], temps: np.ndarray):
+        import numpy as np
+
+        self.base_time = base_time
+        self.rooms = rooms
+        self.temps = temps
+        self.scored = np.zeros(temps.shape, dtype=bool)
+
+
+class ForecastAccuracyTracker:
+    """Compare past forecasts with the readings that arrive later.
+
+    Forecasts are kept per house in a bounded ring buffer. Every new batch of
+    readings scores the horizon steps that have become observable and folds the
+    errors into running MAE/bias/RMSE aggregates per (house, room, horizon), so
+    the cost of an update never depends on how much history has been seen.
+    Errors are ``predicted - actual`` in °C.
+    """
+
+    def __init__(self, max_pending: int = 32):
+        self.max_pending = max_pending
+        self._pending: dict[str, deque[_PendingForecast]] = {}
+        self._stats: dict[str, dict[str, _RunningError]] = {}
+        self._offsets: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+
+    def record_forecast(self, house_id: str, result: dict):
+        """Remember a prediction result so it can be scored later."""
+        import numpy as np
+
+        base_time = result.get("base_time")
+        rooms = list(result.get("rooms", {}))
+        if base_time is None or not rooms:
+            return
+
+        offsets = [step["offset_min"] for step in result["rooms"][rooms[0]]]
+        temps = np.array(
+            [[step["temp"] for step in result["rooms"][room]] for room in rooms],
+            dtype=np.float32,
+        )
+        forecast = _PendingForecast(datetime.fromisoformat(base_time), rooms, temps)
+
+        with self._lock:
+            if self._offsets.get(house_id) != offsets:
+                # Horizon layout changed (e.g. a new model) — start fresh aggregates
+                # and drop pending forecasts of the old layout
+                self._stats[house_id] = {}
+                self._offsets[house_id] = offsets
+                self._pending.pop(house_id, None)
+            pending = self._pending.setdefault(house_id, deque(maxlen=self.max_pending))
+            pending.append(forecast)
+
+    def observe(self, house_id: str, sensor_df: pd.DataFrame):
+        """Score pending forecasts of a house against newly fetched readings."""
+        import numpy as np
+        import pandas as pd
+
+        with self._lock:
+            pending = self._pending.get(house_id)
+            if not pending or sensor_df.empty or "Timestamp" not in sensor_df.columns:
+                return
+
+            room_cols = sorted(
+                {r for f in pending for r in f.rooms} & set(sensor_df.columns)
+            )
+            if not room_cols:
+                return
+
+            # Same 10-min mean bins the model is trained on; only complete bins count
+            timestamps = pd.to_datetime(sensor_df["Timestamp"], utc=True)
+            observed = (
+                sensor_df[room_cols]
+                .set_index(pd.DatetimeIndex(timestamps))
+                .resample("10min")
+                .mean()
+            )
+            observed = observed[observed.index + STEP <= timestamps.max()]
+            if observed.empty:
+                return
+
+            offsets = self._offsets[house_id]
+            stats = self._stats[house_id]
+            scored_steps = 0
+            for forecast in pending:
+                targets = pd.DatetimeIndex(
+                    [forecast.base_time + timedelta(minutes=m) for m in offsets]
+                ).tz_convert("UTC")
+                for i, room in enumerate(forecast.rooms):
+                    if room not in observed.columns:
+                        continue
+                    actual = observed[room].reindex(targets).to_numpy(dtype=np.float64)
+                    mask = ~forecast.scored[i] & ~np.isnan(actual)
+                    if not mask.any():
+                        continue
+                    room_stats = stats.get(room)
+                    if room_stats is None:
+                        room_stats = stats[room] = _RunningError(len(offsets))
+                    room_stats.update(mask, forecast.temps[i] - actual)
+                    forecast.scored[i] |= mask
+                    scored_steps += int(mask.sum())
+
+            # Fully scored forecasts leave the buffer; the maxlen drops stale ones
+            self._pending[house_id] = deque(
+                (f for f in pending if not f.scored.all()), maxlen=self.max_pending
+            )
+
+        if scored_steps:
+            logger.info("Scored %d forecast step(s) for %s", scored_steps, house_id)
+
+    def summary(self, house_id: str | None = None) -> dict:
+        """Return per-room, per-horizon error aggregates, optionally for one house."""
+        with self._lock:
+            houses = [house_id] if house_id is not None else list(self._stats)
+            return {
+                house: {
+                    "pending_forecasts": len(self._pending.get(house, ())),
+                    "rooms": {
+                        room: room_stats.summary(self._offsets[house])
+                        for room, room_stats in self._stats.get(house, {}).items()
+                    },
+                }
+                for house in houses
+            }
+
+
+tracker = ForecastAccuracyTracker()
@@ -0,0 +1,162 @@
+"""Historical backfill: score every 10-minute step of a long history.
+
+Usage:
+    python -m app.ml.backfill --input history.parquet --output backfill/woning16
+    python -m app.ml.backfill --start 2025-01-01 --end 2025-06-30 --output backfill/woning16
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import torch
+
+from app.config import settings
+from app.ml.history import fetch_history, load_history_file, parse_date
+from app.ml.model import DigitalTwinModel
+
+logger = logging.getLogger(__name__)
+
+
+def observed_temperatures(
+    history_df: pd.DataFrame, index: pd.DatetimeIndex, rooms: list[str]
+) -> np.ndarray:
+    """10-minute mean room temperatures from the raw readings, NaN where a bin has none.
+
+    ``prepare_clean_df`` fills gaps so the model always has input; scoring
+    against those filled values would count made-up readings as actuals.
+    """
+    df = history_df
+    if "Timestamp" in df.columns:
+        df = df.set_index(pd.DatetimeIndex(pd.to_datetime(df["Timestamp"], utc=True)))
+    observed = df[rooms].resample("10min").mean()
+    observed.index = observed.index.tz_convert(index.tz)
+    return observed.reindex(index).to_numpy(dtype=np.float32, copy=True)
+
+
+def run_backfill(
+    history_df: pd.DataFrame,
+    model_path: str | None,
+    model_version: str = "woning16-v1",
+    batch_size: int = 1024,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Forecast every lookback window in ``history_df`` and compare with what happened.
+
+    Returns ``(forecasts, mae)``: a long columnar frame with one row per
+    (issue time, room, horizon step) and a rooms × horizon table of MAE in °C.
+    Steps without real readings keep ``actual`` as NaN and are left out of the MAE.
+    """
+    model = DigitalTwinModel(lookback_steps=144, forecast_steps=18, model_version=model_version)
+    lookback, horizon = model.lookback_steps, model.forecast_steps
+
+    # Preprocess and normalize the whole history once
+    clean_df = model.prepare_clean_df(history_df)
+    series = torch.from_numpy(model.normalize_array(clean_df))
+    model.input_dim = series.shape[1]
+    model.init_network(model_path=model_path, mmap=True)
+    model.eval()
+
+    rooms = model.target_rooms
+    n_windows = len(clean_df) - lookback - horizon + 1
+    if n_windows <= 0:
+        raise ValueError(
+            f"History too short: {len(clean_df)} steps, need at least {lookback + horizon}"
+        )
+    logger.info("Backfilling %d windows for %d rooms", n_windows, len(rooms))
+
+    # Strided views, no copies: windows[i] covers rows i .. i+lookback-1 (features × time)
+    windows = series.unfold(0, lookback, 1)
+    actual = torch.from_numpy(observed_temperatures(history_df, clean_df.index, rooms))
+    # futures[i] covers rows i+lookback .. i+lookback+horizon-1 (rooms × horizon)
+    futures = actual.unfold(0, horizon, 1)[lookback : lookback + n_windows]
+
+    predicted = np.empty((n_windows, len(rooms), horizon), dtype=np.float32)
+    with torch.inference_mode():
+        for start in range(0, n_windows, batch_size):
+            stop = min(start + batch_size, n_windows)
+            batch = windows[start:stop].transpose(1, 2)
+            out = model(batch).view(stop - start, len(rooms), horizon)
+            # Denormalize: T_actual = T_norm * 35 + 10
+            predicted[start:stop] = (out * 35 + 10).numpy()
+
+    actual_np = futures.numpy()
+    abs_error = np.abs(predicted - actual_np)
+
+    horizon_min = (np.arange(horizon) + 1) * 10
+    scored = ~np.isnan(abs_error)
+    logger.info(
+        "%d of %d forecast steps have readings to score against", scored.sum(), scored.size
+    )
+    with np.errstate(invalid="ignore"):
+        # Mean over scored steps only; NaN where a step never had a reading
+        mae_values = np.nansum(abs_error, axis=0) / scored.sum(axis=0)
+    mae = pd.DataFrame(mae_values, index=rooms, columns=horizon_min)
+    mae.index.name = "room"
+    mae.columns.name = "offset_min"
+
+    issue_times = clean_df.index[lookback - 1 : lookback - 1 + n_windows].tz_convert("UTC")
+    per_window = len(rooms) * horizon
+    forecasts = pd.DataFrame({
+        "issue_time": issue_times.repeat(per_window),
+        "room": pd.Categorical.from_codes(
+            np.tile(np.repeat(np.arange(len(rooms)), horizon), n_windows), categories=rooms
+        ),
+        "offset_min": np.tile(horizon_min, n_windows * len(rooms)).astype(np.int16),
+        "predicted": predicted.ravel(),
+        "actual": actual_np.ravel(),
+    })
+    forecasts["target_time"] = forecasts["issue_time"] + pd.to_timedelta(
+        forecasts["offset_min"], unit="min"
+    )
+
+    return forecasts, mae
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill historical forecasts and score them")
+    parser.add_argument("--house-id", default=settings.HOUSE_ID)
+    parser.add_argument("--input", help="Local history file (.parquet or .csv)")
+    parser.add_argument("--start", type=parse_date, help="Fetch history from the sensor API from this date")
+    parser.add_argument("--end", type=parse_date, help="End of the sensor API range")
+    parser.add_argument("--model-path", help="Weights file (defaults to MODEL_PATH)")
+    parser.add_argument("--output", required=True, help="Output directory")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+
+    if args.input:
+        history_df = load_history_file(args.input)
+    elif args.start and args.end:
+        history_df = asyncio.run(fetch_history(args.start, args.end, house_id=args.house_id))
+    else:
+        parser.error("either --input or both --start and --end are required")
+
+    model_path = args.model_path or settings.MODEL_PATH.format(house_id=args.house_id)
+
+    started = time.perf_counter()
+    forecasts, mae = run_backfill(
+        history_df,
+        model_path=model_path,
+        model_version=f"{args.house_id}-{settings.MODEL_VERSION}",
+        batch_size=args.batch_size,
+    )
+    logger.info("Backfill finished in %.1fs", time.perf_counter() - started)
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+    forecasts.to_parquet(output / "forecasts.parquet", index=False)
+    mae.to_csv(output / "mae_by_horizon.csv")
+    logger.info("Wrote %d forecast rows to %s", len(forecasts), output)
+    print(mae.round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import logging
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from app.clients import sensor_client
+from app.config import refresh_secrets
+
+logger = logging.getLogger(__name__)
+
+
+def parse_date(value: str) -> datetime:
+    """Parse an ISO date for the CLI; naive values are taken as Amsterdam time."""
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo else dt.replace(tzinfo=ZoneInfo("Europe/Amsterdam"))
+
+
+def load_history_file(path: str | Path) -> pd.DataFrame:
+    """Load a merged sensor history (as produced by ``fetch_sensor_data``) from disk.
+
+    Parquet and CSV files are supported. The result has a ``Timestamp`` column so
+    it can be passed straight to ``DigitalTwinModel.prepare_clean_df``.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        df = pd.read_parquet(path)
+    elif path.suffix == ".csv":
+        df = pd.read_csv(path)
+    else:
+        raise ValueError(f"Unsupported history file format: {path.suffix}")
+
+    if "Timestamp" not in df.columns:
+        df = df.rename_axis("Timestamp").reset_index()
+    df["Timestamp"] = pd.to_datetime(df["Timestamp"], utc=True)
+
+    logger.info("Loaded history from %s: %s", path, df.shape)
+    return df.sort_values("Timestamp").reset_index(drop=True)
+
+
+async def fetch_history(
+    start_time: datetime, end_time: datetime, house_id: str | None = None
+) -> pd.DataFrame:
+    """Fetch a historical range of one house from the Calculus sensor API.
+
+    Gaps are left as NaN so backfill can tell real readings from filled ones;
+    ``prepare_clean_df`` fills them after resampling.
+    """
+    # Outside the server nothing refreshes secrets, so make sure the API key is current
+    refresh_secrets()
+    return await sensor_client.fetch_sensor_data(
+        start_time=start_time, end_time=end_time, house_id=house_id, fill_gaps=False
+    )
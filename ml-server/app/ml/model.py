@@ -0,0 +1,147 @@
+import logging
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+
+class DigitalTwinModel(nn.Module):
+    def __init__(self, lookback_steps=144, forecast_steps=18, model_version="woning16-v1"):
+        super().__init__()
+        self.lookback_steps = lookback_steps
+        self.forecast_steps = forecast_steps  # 18 steps * 10 min = 3 hours
+        self.model_version = model_version
+        self.tz = ZoneInfo("Europe/Amsterdam")
+
+        self.input_dim = None
+        self.target_rooms = []
+        self.net = None
+
+    def prepare_clean_df(self, df_merged: pd.DataFrame) -> pd.DataFrame:
+        df = df_merged.copy()
+        if "Timestamp" in df.columns:
+            df["Timestamp"] = pd.to_datetime(df["Timestamp"], utc=True)
+            df.set_index("Timestamp", inplace=True)
+        df = df.tz_convert(self.tz)
+
+        # Filter out watermeter-related columns
+        df = df[[c for c in df.columns if "watermeter" not in c.lower()]]
+
+        # Identify target rooms (columns ending in 'temperature')
+        self.target_rooms = [c for c in df.columns if c.lower().endswith("temperature")]
+
+        # Keep only temperature, setpoint, and PIR features
+        keywords = ["temperature", "set", "pir"]
+        feature_cols = [c for c in df.columns if any(k in c.lower() for k in keywords)]
+        df = df[feature_cols]
+
+        # Resample to 10-min intervals
+        df_resampled = df.resample("10min").agg(
+            {c: ("max" if "pir" in c.lower() else "mean") for c in df.columns}
+        )
+        df_resampled = df_resampled.interpolate(method="linear").ffill().bfill()
+
+        # Cyclical time encoding
+        df_resampled["hour_sin"] = np.sin(2 * np.pi * df_resampled.index.hour / 24)
+        df_resampled["hour_cos"] = np.cos(2 * np.pi * df_resampled.index.hour / 24)
+        df_resampled["day_sin"] = np.sin(2 * np.pi * df_resampled.index.dayofweek / 7)
+        df_resampled["day_cos"] = np.cos(2 * np.pi * df_resampled.index.dayofweek / 7)
+
+        return df_resampled
+
+    def normalization_params(self, columns) -> tuple[np.ndarray, np.ndarray]:
+        """Per-column (offset, scale) such that x_norm = clip((x - offset) / scale, 0, 1)."""
+        offset = np.zeros(len(columns))
+        scale = np.ones(len(columns))
+        for i, col in enumerate(columns):
+            if "temperature" in col.lower():
+                # T_norm = (T_actual - 10) / 35
+                offset[i], scale[i] = 10.0, 35.0
+            elif col in ("hour_sin", "hour_cos", "day_sin", "day_cos"):
+                # Shift cyclical features to [0, 1]
+                offset[i], scale[i] = -1.0, 2.0
+        return offset, scale
+
+    def normalize_array(self, df_processed: pd.DataFrame) -> np.ndarray:
+        """Normalize every row of a preprocessed frame into a float32 array."""
+        offset, scale = self.normalization_params(df_processed.columns)
+        values = (df_processed.to_numpy(dtype=np.float64) - offset) / scale
+        return np.clip(values, 0, 1).astype(np.float32)
+
+    def dataframe_to_tensor(self, df_processed: pd.DataFrame) -> torch.Tensor:
+        df = df_processed
+        if len(df) > self.lookback_steps:
+            df = df.iloc[-self.lookback_steps :]
+
+        self.input_dim = df.shape[1]
+        return torch.from_numpy(self.normalize_array(df))
+
+    def init_network(self, model_path=None, mmap=False):
+        num_targets = len(self.target_rooms)
+        output_dim = num_targets * self.forecast_steps
+
+        self.net = nn.Sequential(
+            nn.Flatten(),
+            nn.Linear(self.lookback_steps * self.input_dim, 1024),
+            nn.ReLU(),
+            nn.Dropout(0.2),
+            nn.Linear(1024, 512),
+            nn.ReLU(),
+            nn.Linear(512, output_dim),
+        )
+
+        if model_path:
+            # With mmap the weights stay backed by the file and are paged in on
+            # demand; assign=True keeps those tensors instead of copying them.
+            state_dict = torch.load(model_path, map_location="cpu", weights_only=True, mmap=mmap)
+            self.load_state_dict(state_dict, assign=mmap)
+            self.eval()
+            logger.info("Model weights loaded for %d rooms from %s", num_targets, model_path)
+        else:
+            logger.warning("No model path — using random weights for %d rooms", num_targets)
+
+    def forward(self, x):
+        return self.net(x)
+
+    def predict_batch(self, input_batch: torch.Tensor) -> torch.Tensor:
+        """Forecast a batch of normalized windows; returns (batch, rooms, steps) in °C."""
+        with torch.no_grad():
+            raw_out = self.forward(input_batch)
+        return raw_out.view(len(input_batch), len(self.target_rooms), self.forecast_steps) * 35 + 10
+
+    def predict_future(self, input_tensor: torch.Tensor) -> dict:
+        if input_tensor.dim() == 2:
+            x = input_tensor.unsqueeze(0)
+        else:
+            x = input_tensor
+
+        with torch.no_grad():
+            raw_out = self.forward(x)
+            room_forecasts = raw_out.view(len(self.target_rooms), self.forecast_steps)
+
+        result = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "meta": {
+                "type": "Multi-Room Temperature Prediction",
+                "horizon": "3 Hours",
+                "resolution": "10 min",
+                "model_version": self.model_version,
+            },
+            "rooms": {},
+        }
+
+        # Denormalize: T_actual = T_norm * 35 + 10
+        for i, room_name in enumerate(self.target_rooms):
+            room_data = room_forecasts[i].tolist()
+            actual_temps = [round(t * 35 + 10, 2) for t in room_data]
+            result["rooms"][room_name] = [
+                {"offset_min": (j + 1) * 10, "temp": t}
+                for j, t in enumerate(actual_temps)
+            ]
+
+        return result
@@ -0,0 +1,89 @@
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def model_nbytes(model) -> int:
+    """Return the memory footprint of a model's parameters and buffers in bytes."""
+    total = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ModelCache:
+    """LRU cache of loaded models keyed by (house_id, model_version).
+
+    Entries are evicted least-recently-used first whenever the summed parameter
+    size exceeds ``max_bytes``. The most recently inserted model is always kept,
+    even if it alone is larger than the budget.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str], tuple[object, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, house_id: str, model_version: str):
+        """Return the cached model and mark it as recently used, or None on a miss."""
+        key = (house_id, model_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, house_id: str, model_version: str, model) -> None:
+        """Insert a loaded model and evict older entries until the budget fits."""
+        key = (house_id, model_version)
+        size = model_nbytes(model)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._current_bytes -= old[1]
+            self._entries[key] = (model, size)
+            self._current_bytes += size
+
+            while self._current_bytes > self.max_bytes and len(self._entries) > 1:
+                (evicted_house, evicted_version), (_, evicted_size) = self._entries.popitem(
+                    last=False
+                )
+                self._current_bytes -= evicted_size
+                self.evictions += 1
+                logger.info(
+                    "Evicted model %s/%s (%.1f MB) from cache",
+                    evicted_house,
+                    evicted_version,
+                    evicted_size / 1e6,
+                )
+
+    def invalidate(self, house_id: str, model_version: str | None = None) -> None:
+        """Drop one model version, or every version for a house."""
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] == house_id and model_version in (None, key[1]):
+                    _, size = self._entries.pop(key)
+                    self._current_bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "current_bytes": self._current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "models": [f"{house}/{version}" for house, version in self._entries],
+            }
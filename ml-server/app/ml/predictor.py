@@ -1,170 +1,208 @@
+from __future__ import annotations
+
 import logging
-from datetime import datetime, timezone
-from zoneinfo import ZoneInfo
+from typing import TYPE_CHECKING
 
-import numpy as np
-import pandas as pd
-import torch
-import torch.nn as nn
+from app.ml.model_cache import ModelCache
+from app.startup import timed_phase
 
-logger = logging.getLogger(__name__)
+if TYPE_CHECKING:
+    import pandas as pd
 
+    from app.ml.model import DigitalTwinModel
 
-class DigitalTwinModel(nn.Module):
-    def __init__(self, lookback_steps=144, forecast_steps=18):
-        super().__init__()
-        self.lookback_steps = lookback_steps
-        self.forecast_steps = forecast_steps  # 18 steps * 10 min = 3 hours
-        self.tz = ZoneInfo("Europe/Amsterdam")
-
-        self.input_dim = None
-        self.target_rooms = []
-        self.net = None
-
-    def prepare_clean_df(self, df_merged: pd.DataFrame) -> pd.DataFrame:
-        df = df_merged.copy()
-        if "Timestamp" in df.columns:
-            df["Timestamp"] = pd.to_datetime(df["Timestamp"], utc=True)
-            df.set_index("Timestamp", inplace=True)
-        df = df.tz_convert(self.tz)
-
-        # Filter out watermeter-related columns
-        df = df[[c for c in df.columns if "watermeter" not in c.lower()]]
-
-        # Identify target rooms (columns ending in 'temperature')
-        self.target_rooms = [c for c in df.columns if c.lower().endswith("temperature")]
-
-        # Keep only temperature, setpoint, and PIR features
-        keywords = ["temperature", "set", "pir"]
-        feature_cols = [c for c in df.columns if any(k in c.lower() for k in keywords)]
-        df = df[feature_cols]
-
-        # Resample to 10-min intervals
-        df_resampled = df.resample("10min").agg(
-            {c: ("max" if "pir" in c.lower() else "mean") for c in df.columns}
-        )
-        df_resampled = df_resampled.interpolate(method="linear").ffill().bfill()
-
-        # Cyclical time encoding
-        df_resampled["hour_sin"] = np.sin(2 * np.pi * df_resampled.index.hour / 24)
-        df_resampled["hour_cos"] = np.cos(2 * np.pi * df_resampled.index.hour / 24)
-        df_resampled["day_sin"] = np.sin(2 * np.pi * df_resampled.index.dayofweek / 7)
-        df_resampled["day_cos"] = np.cos(2 * np.pi * df_resampled.index.dayofweek / 7)
-
-        return df_resampled
-
-    def dataframe_to_tensor(self, df_processed: pd.DataFrame) -> torch.Tensor:
-        df = df_processed.copy()
-
-        # Normalize temperatures: T_norm = (T_actual - 10) / 35
-        temp_related = [c for c in df.columns if "temperature" in c.lower()]
-        for col in temp_related:
-            df[col] = (df[col] - 10) / 35
-
-        pir_cols = [c for c in df.columns if "pir" in c.lower()]
-        for col in pir_cols:
-            df[col] = df[col].clip(0, 1)
-
-        # Shift cyclical features to [0, 1]
-        for col in ["hour_sin", "hour_cos", "day_sin", "day_cos"]:
-            df[col] = (df[col] + 1) / 2
-
-        df = df.clip(0, 1)
-
-        if len(df) > self.lookback_steps:
-            df = df.iloc[-self.lookback_steps :]
-
-        self.input_dim = df.shape[1]
-        return torch.tensor(df.values, dtype=torch.float32)
-
-    def init_network(self, model_path=None):
-        num_targets = len(self.target_rooms)
-        output_dim = num_targets * self.forecast_steps
-
-        self.net = nn.Sequential(
-            nn.Flatten(),
-            nn.Linear(self.lookback_steps * self.input_dim, 1024),
-            nn.ReLU(),
-            nn.Dropout(0.2),
-            nn.Linear(1024, 512),
-            nn.ReLU(),
-            nn.Linear(512, output_dim),
-        )
-
-        if model_path:
-            self.load_state_dict(torch.load(model_path, map_location="cpu", weights_only=True))
-            self.eval()
-            logger.info("Model weights loaded for %d rooms from %s", num_targets, model_path)
-        else:
-            logger.warning("No model path — using random weights for %d rooms", num_targets)
-
-    def forward(self, x):
-        return self.net(x)
-
-    def predict_future(self, input_tensor: torch.Tensor) -> dict:
-        if input_tensor.dim() == 2:
-            x = input_tensor.unsqueeze(0)
-        else:
-            x = input_tensor
-
-        with torch.no_grad():
-            raw_out = self.forward(x)
-            room_forecasts = raw_out.view(len(self.target_rooms), self.forecast_steps)
-
-        result = {
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "meta": {
-                "type": "Multi-Room Temperature Prediction",
-                "horizon": "3 Hours",
-                "resolution": "10 min",
-                "model_version": "woning16-v1",
-            },
-            "rooms": {},
-        }
-
-        # Denormalize: T_actual = T_norm * 35 + 10
-        for i, room_name in enumerate(self.target_rooms):
-            room_data = room_forecasts[i].tolist()
-            actual_temps = [round(t * 35 + 10, 2) for t in room_data]
-            result["rooms"][room_name] = [
-                {"offset_min": (j + 1) * 10, "temp": t}
-                for j, t in enumerate(actual_temps)
-            ]
-
-        return result
+logger = logging.getLogger(__name__)
 
 
 # ── Module-level predictor state ──
 
-_model: DigitalTwinModel | None = None
+_cache: ModelCache | None = None
 _model_path: str | None = None
-_network_initialized: bool = False
+_model_version: str = "v1"
+_model_class: type[DigitalTwinModel] | None = None
+# Last preprocessed input window per house, kept for what-if scenarios
+_last_windows: dict[str, dict] = {}
+
+
+def _get_model_class() -> type[DigitalTwinModel]:
+    """Import the model module (and with it torch/pandas) on first use."""
+    global _model_class
+    if _model_class is None:
+        with timed_phase("model_import"):
+            from app.ml.model import DigitalTwinModel
+        _model_class = DigitalTwinModel
+    return _model_class
+
+
+def init(model_path: str, model_version: str = "v1", cache_max_bytes: int = 512 * 1024**2):
+    """Initialize the predictor. Call once at startup.
+
+    ``model_path`` may contain a ``{house_id}`` placeholder so every house loads
+    its own weights, e.g. ``model/{house_id}_model.pth``.
+    """
+    global _cache, _model_path, _model_version
+    _cache = ModelCache(max_bytes=cache_max_bytes)
+    _model_path = model_path
+    _model_version = model_version
+    logger.info(
+        "Predictor initialized (models load on first prediction, cache budget %.0f MB)",
+        cache_max_bytes / 1024**2,
+    )
 
 
-def init(model_path: str):
-    """Initialize the predictor. Call once at startup."""
-    global _model, _model_path, _network_initialized
-    _model = DigitalTwinModel(lookback_steps=144, forecast_steps=18)
-    _model_path = model_path
-    _network_initialized = False
-    logger.info("Predictor initialized (model will load on first prediction)")
+def model_path_for(house_id: str) -> str | None:
+    """Resolve the weights file for a house."""
+    if not _model_path:
+        return None
+    return _model_path.format(house_id=house_id)
 
 
-def predict(sensor_df: pd.DataFrame) -> dict:
+def predict(sensor_df: pd.DataFrame, house_id: str) -> dict:
     """Run the full prediction pipeline: preprocess → tensor → model → forecast."""
-    global _network_initialized
-
-    if _model is None:
+    if _cache is None:
         raise RuntimeError("Predictor not initialized — call init() first")
 
-    clean_df = _model.prepare_clean_df(sensor_df)
-    logger.info("Preprocessed data: %s, target rooms: %d", clean_df.shape, len(_model.target_rooms))
+    model = _cache.get(house_id, _model_version)
+    cached = model is not None
+    if not cached:
+        model = _new_model(house_id)
+
+    clean_df = model.prepare_clean_df(sensor_df)
+    logger.info("Preprocessed data: %s, target rooms: %d", clean_df.shape, len(model.target_rooms))
 
-    input_tensor = _model.dataframe_to_tensor(clean_df)
+    input_tensor = model.dataframe_to_tensor(clean_df)
     logger.info("Input tensor: %s", input_tensor.shape)
 
-    if not _network_initialized:
-        _model.init_network(model_path=_model_path)
-        _network_initialized = True
+    if not cached:
+        model.init_network(model_path=model_path_for(house_id), mmap=True)
+        _cache.put(house_id, _model_version, model)
+
+    result = model.predict_future(input_tensor)
+    # Start of the last input step; forecast offsets are relative to it
+    result["base_time"] = clean_df.index[-1].tz_convert("UTC").isoformat()
+
+    _last_windows[house_id] = {
+        "window": clean_df.iloc[-model.lookback_steps :],
+        "target_rooms": list(model.target_rooms),
+        "base_time": result["base_time"],
+    }
+    return result
+
+
+def _new_model(house_id: str) -> DigitalTwinModel:
+    return _get_model_class()(
+        lookback_steps=144,
+        forecast_steps=18,
+        model_version=f"{house_id}-{_model_version}",
+    )
+
+
+def _resolve_setpoint_column(key: str, columns: list[str]) -> int:
+    """Map a ``*_set`` column or a room's temperature column to a setpoint column index."""
+    if key.endswith("_temperature"):
+        key = key.rsplit("_temperature", 1)[0] + "_set"
+    if key not in columns or not key.lower().endswith("set"):
+        available = [c for c in columns if c.lower().endswith("set")]
+        raise ValueError(f"Unknown setpoint {key!r}; available: {available}")
+    return columns.index(key)
+
+
+def predict_scenarios(house_id: str, scenarios: list[dict[str, float | list[float]]]) -> dict:
+    """Forecast alternative setpoint trajectories in one batched forward pass.
+
+    Each scenario maps a setpoint column (or room temperature column) to either
+    a constant held over the whole input window or a list of values (°C) that
+    replaces the last ``len(values)`` steps of the window. The unmodified window
+    is scored alongside as the baseline, and deltas are reported against it.
+
+    Values that normalize outside [0, 1] are clipped like the model's training
+    data, so the model cannot see them. Each scenario lists such keys under
+    ``saturated`` and the response carries a ``warnings`` entry per key.
+    """
+    import numpy as np
+    import torch
+
+    if _cache is None:
+        raise RuntimeError("Predictor not initialized — call init() first")
 
-    return _model.predict_future(input_tensor)
+    last = _last_windows.get(house_id)
+    if last is None:
+        raise LookupError(f"No prediction has run for house {house_id} yet")
+
+    window = last["window"]
+    columns = list(window.columns)
+
+    model = _cache.get(house_id, _model_version)
+    if model is None:
+        model = _new_model(house_id)
+        model.target_rooms = list(last["target_rooms"])
+        model.input_dim = len(columns)
+        model.init_network(model_path=model_path_for(house_id), mmap=True)
+        _cache.put(house_id, _model_version, model)
+
+    lookback = len(window)
+    # Row 0 is the baseline; every scenario gets its own modified copy
+    batch = np.repeat(window.to_numpy(dtype=np.float64)[None], len(scenarios) + 1, axis=0)
+    # Per scenario: (key, column, first modified step)
+    modified: list[list[tuple[str, int, int]]] = []
+    for i, scenario in enumerate(scenarios, start=1):
+        modified.append([])
+        for key, values in scenario.items():
+            col = _resolve_setpoint_column(key, columns)
+            if isinstance(values, (int, float)):
+                batch[i, :, col] = values
+                modified[-1].append((key, col, 0))
+                continue
+            if not 0 < len(values) <= lookback:
+                raise ValueError(f"Trajectory for {key!r} must have 1–{lookback} values")
+            batch[i, lookback - len(values) :, col] = values
+            modified[-1].append((key, col, lookback - len(values)))
+
+    offset, scale = model.normalization_params(columns)
+    normalized = (batch - offset) / scale
+    out_of_range = (normalized < 0) | (normalized > 1)
+    inputs = torch.from_numpy(np.clip(normalized, 0, 1).astype(np.float32))
+    # Without a weights file the network is fresh and would still be in train mode
+    model.eval()
+    forecasts = model.predict_batch(inputs).numpy().astype(np.float64)
+
+    baseline = forecasts[0]
+    rooms = list(last["target_rooms"])
+    results = []
+    saturated_counts: dict[str, int] = {}
+    for i, scenario_forecast in enumerate(forecasts[1:], start=1):
+        delta = scenario_forecast - baseline
+        saturated = [
+            key for key, col, start in modified[i - 1] if out_of_range[i, start:, col].any()
+        ]
+        for key in saturated:
+            saturated_counts[key] = saturated_counts.get(key, 0) + 1
+        results.append({
+            "forecast": {room: scenario_forecast[r].round(2).tolist() for r, room in enumerate(rooms)},
+            "delta_mean": {room: round(float(delta[r].mean()), 3) for r, room in enumerate(rooms)},
+            "delta_end": {room: round(float(delta[r, -1]), 3) for r, room in enumerate(rooms)},
+            "saturated": saturated,
+        })
+
+    warnings = [
+        f"{key!r} lies outside the model's input range in {count} scenario(s) and was "
+        "clipped; the forecast cannot reflect those values"
+        for key, count in saturated_counts.items()
+    ]
+    if warnings:
+        logger.warning("Scenarios for %s: %s", house_id, "; ".join(warnings))
+
+    return {
+        "house_id": house_id,
+        "base_time": last["base_time"],
+        "model_version": model.model_version,
+        "offsets_min": [(j + 1) * 10 for j in range(model.forecast_steps)],
+        "baseline": {room: baseline[r].round(2).tolist() for r, room in enumerate(rooms)},
+        "scenarios": results,
+        "warnings": warnings,
+    }
+
+
+def cache_stats() -> dict | None:
+    """Return hit/miss/eviction counters of the model cache."""
+    return _cache.stats() if _cache else None
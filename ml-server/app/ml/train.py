@@ -0,0 +1,240 @@
+"""Train or fine-tune a DigitalTwinModel for one house.
+
+The history is preprocessed once into a normalized array on disk; lookback and
+forecast windows are then read lazily from a memory map by the DataLoader
+workers, so memory use does not grow with the number of windows.
+
+Usage:
+    python -m app.ml.train --input history.parquet --output model/woning16_model.pth
+    python -m app.ml.train --start 2025-01-01 --end 2025-06-30 --house-id woning16 \\
+        --init-from model/woning16_model.pth --epochs 5
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Dataset
+
+from app.config import settings
+from app.ml.history import fetch_history, load_history_file, parse_date
+from app.ml.model import DigitalTwinModel
+
+logger = logging.getLogger(__name__)
+
+
+class WindowDataset(Dataset):
+    """(lookback, forecast) windows served from a memory-mapped ``.npy`` series.
+
+    ``x`` is ``(lookback, features)``; ``y`` holds the normalized target room
+    temperatures flattened room-major, matching ``predict_future``'s output view.
+    """
+
+    def __init__(
+        self,
+        series_path: str,
+        lookback: int,
+        horizon: int,
+        target_idx: list[int],
+        start: int,
+        stop: int,
+    ):
+        self.series_path = series_path
+        self.lookback = lookback
+        self.horizon = horizon
+        self.target_idx = np.asarray(target_idx)
+        self.start = start
+        self.stop = stop
+        # Opened lazily so each worker process maps the file itself
+        self._series: np.ndarray | None = None
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        if self._series is None:
+            self._series = np.load(self.series_path, mmap_mode="r")
+        t = self.start + i
+        x = np.array(self._series[t : t + self.lookback])
+        y = self._series[t + self.lookback : t + self.lookback + self.horizon, self.target_idx]
+        return torch.from_numpy(x), torch.from_numpy(np.ascontiguousarray(y.T).reshape(-1))
+
+
+def prepare_series(
+    model: DigitalTwinModel, history_df: pd.DataFrame, workdir: Path
+) -> tuple[Path, list[int]]:
+    """Preprocess the history once and store the normalized series as ``series.npy``."""
+    clean_df = model.prepare_clean_df(history_df)
+    series = model.normalize_array(clean_df)
+    model.input_dim = series.shape[1]
+
+    workdir.mkdir(parents=True, exist_ok=True)
+    series_path = workdir / "series.npy"
+    np.save(series_path, series)
+    with open(workdir / "columns.json", "w", encoding="utf-8") as f:
+        json.dump({"columns": list(clean_df.columns), "target_rooms": model.target_rooms}, f)
+
+    target_idx = [clean_df.columns.get_loc(room) for room in model.target_rooms]
+    logger.info(
+        "Prepared series %s with %d features, %d target rooms",
+        series.shape, model.input_dim, len(target_idx),
+    )
+    return series_path, target_idx
+
+
+def _evaluate(model: DigitalTwinModel, loader: DataLoader, loss_fn) -> float:
+    model.eval()
+    total, count = 0.0, 0
+    with torch.no_grad():
+        for x, y in loader:
+            total += loss_fn(model(x), y).item() * len(x)
+            count += len(x)
+    return total / count if count else math.nan
+
+
+def train(
+    history_df: pd.DataFrame,
+    output_path: str,
+    workdir: Path,
+    init_from: str | None = None,
+    epochs: int = 20,
+    batch_size: int = 256,
+    lr: float = 1e-3,
+    num_workers: int = 2,
+    val_fraction: float = 0.1,
+    checkpoint_path: Path | None = None,
+    resume: bool = False,
+) -> float:
+    """Train a model and save the best weights so ``init_network`` can load them.
+
+    Returns the best validation loss (MSE on normalized temperatures).
+    """
+    model = DigitalTwinModel(lookback_steps=144, forecast_steps=18)
+    lookback, horizon = model.lookback_steps, model.forecast_steps
+    series_path, target_idx = prepare_series(model, history_df, workdir)
+
+    n_steps = np.load(series_path, mmap_mode="r").shape[0]
+    n_windows = n_steps - lookback - horizon + 1
+    if n_windows <= 1:
+        raise ValueError(
+            f"History too short: {n_steps} steps, need at least {lookback + horizon + 1}"
+        )
+
+    # Chronological split so validation windows lie after the training windows
+    n_val = max(1, int(n_windows * val_fraction))
+    n_train = n_windows - n_val
+    train_ds = WindowDataset(str(series_path), lookback, horizon, target_idx, 0, n_train)
+    val_ds = WindowDataset(str(series_path), lookback, horizon, target_idx, n_train, n_windows)
+
+    loader_kwargs = {
+        "batch_size": batch_size,
+        "num_workers": num_workers,
+        "persistent_workers": num_workers > 0,
+    }
+    train_loader = DataLoader(train_ds, shuffle=True, **loader_kwargs)
+    val_loader = DataLoader(val_ds, shuffle=False, **loader_kwargs)
+
+    model.init_network(model_path=init_from)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    loss_fn = nn.MSELoss()
+
+    start_epoch, best_val = 0, math.inf
+    if checkpoint_path is None:
+        checkpoint_path = workdir / "checkpoint.pt"
+    if resume and checkpoint_path.exists():
+        checkpoint = torch.load(checkpoint_path, map_location="cpu", weights_only=True)
+        model.load_state_dict(checkpoint["model"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        start_epoch = checkpoint["epoch"] + 1
+        best_val = checkpoint["best_val"]
+        logger.info("Resumed from %s at epoch %d", checkpoint_path, start_epoch)
+
+    logger.info("Training on %d windows, validating on %d", n_train, n_val)
+    for epoch in range(start_epoch, epochs):
+        model.train()
+        running, seen = 0.0, 0
+        for x, y in train_loader:
+            optimizer.zero_grad()
+            loss = loss_fn(model(x), y)
+            loss.backward()
+            optimizer.step()
+            running += loss.item() * len(x)
+            seen += len(x)
+
+        val_loss = _evaluate(model, val_loader, loss_fn)
+        # Validation MSE in normalized units; × 35 converts the RMSE back to °C
+        logger.info(
+            "Epoch %d/%d — train %.5f, val %.5f (RMSE %.2f °C)",
+            epoch + 1, epochs, running / seen, val_loss, math.sqrt(val_loss) * 35,
+        )
+
+        if val_loss < best_val:
+            best_val = val_loss
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            torch.save(model.state_dict(), output_path)
+            logger.info("Saved best weights to %s", output_path)
+
+        torch.save(
+            {
+                "epoch": epoch,
+                "model": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "best_val": best_val,
+            },
+            checkpoint_path,
+        )
+
+    return best_val
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or fine-tune a DigitalTwinModel")
+    parser.add_argument("--house-id", default=settings.HOUSE_ID)
+    parser.add_argument("--input", help="Local history file (.parquet or .csv)")
+    parser.add_argument("--start", type=parse_date, help="Fetch history from the sensor API from this date")
+    parser.add_argument("--end", type=parse_date, help="End of the sensor API range")
+    parser.add_argument("--output", help="Where to write the weights (defaults to MODEL_PATH)")
+    parser.add_argument("--init-from", help="Existing weights to fine-tune")
+    parser.add_argument("--workdir", default="train_work", help="Directory for the series and checkpoints")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=settings.LOG_LEVEL,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    )
+
+    if args.input:
+        history_df = load_history_file(args.input)
+    elif args.start and args.end:
+        history_df = asyncio.run(fetch_history(args.start, args.end, house_id=args.house_id))
+    else:
+        parser.error("either --input or both --start and --end are required")
+
+    best_val = train(
+        history_df,
+        output_path=args.output or settings.MODEL_PATH.format(house_id=args.house_id),
+        workdir=Path(args.workdir) / args.house_id,
+        init_from=args.init_from,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        lr=args.lr,
+        num_workers=args.workers,
+        resume=args.resume,
+    )
+    logger.info("Training finished — best validation MSE %.5f", best_val)
+
+
+if __name__ == "__main__":
+    main()
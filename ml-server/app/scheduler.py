@@ -1,79 +1,251 @@
+import asyncio
+import hashlib
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_SUBMITTED
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
-from app.config import settings
+from app.broadcast import broadcaster
+from app.config import add_refresh_listener, settings
 from app.clients import twin_client, sensor_client
 from app.ml import predictor
+from app.ml.accuracy import tracker
 
 logger = logging.getLogger(__name__)
 
 scheduler = AsyncIOScheduler()
 
-last_prediction_time: datetime | None = None
-last_prediction_result: dict | None = None
+# Fixed anchor so every house keeps the same phase across restarts
+_SCHEDULE_ANCHOR = datetime(2024, 1, 1, tzinfo=timezone.utc)
+_JOB_PREFIX = "prediction_cycle:"
 
+last_prediction_times: dict[str, datetime] = {}
+last_prediction_results: dict[str, dict] = {}
 
-async def run_prediction_cycle():
-    """Execute one full prediction cycle: fetch sensor data → predict → push results."""
-    global last_prediction_time, last_prediction_result
+_house_runs: dict[str, dict] = {}
+# (houses, interval, jitter, concurrency) the current jobs were scheduled with
+_scheduled_config: tuple | None = None
+_cycle_semaphore: asyncio.Semaphore | None = None
+# Bumped whenever anything reported by get_status() changes
+_status_version = 0
 
-    cycle_start = datetime.now(timezone.utc)
-    logger.info("Prediction cycle started at %s", cycle_start.isoformat())
+STATUS_FIELDS = (
+    "scheduler_running",
+    "prediction_interval_minutes",
+    "max_concurrent_cycles",
+    "last_prediction_time",
+    "next_scheduled_run",
+    "last_prediction_result",
+    "houses",
+)
+
+
+def _bump_status_version():
+    global _status_version
+    _status_version += 1
+
+
+def house_phase_offset(house_id: str, interval_seconds: int) -> int:
+    """Deterministic offset of a house within the prediction interval, in seconds."""
+    digest = hashlib.sha256(house_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % interval_seconds
+
+
+def _interval_seconds() -> int:
+    return settings.PREDICTION_INTERVAL_MINUTES * 60
+
+
+def _scheduled_slot(house_id: str, now: datetime) -> datetime:
+    """The most recent time this house's cycle was due (ignoring jitter).
+
+    Fallback for cycles not started by the scheduler, which records the
+    actual (jittered) fire time on submission.
+    """
+    interval = _interval_seconds()
+    start = _SCHEDULE_ANCHOR + timedelta(seconds=house_phase_offset(house_id, interval))
+    periods = int((now - start).total_seconds() // interval)
+    return start + timedelta(seconds=periods * interval)
+
+
+async def run_prediction_cycle(house_id: str | None = None):
+    """Execute one full prediction cycle for a house: fetch sensor data → predict → push results."""
+    global _cycle_semaphore
+    if house_id is None:
+        house_id = settings.HOUSE_ID
+    if _cycle_semaphore is None:
+        _cycle_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_CYCLES)
+
+    run = _house_runs.setdefault(house_id, {"skipped_runs": 0})
+    if run.get("running"):
+        run["skipped_runs"] += 1
+        _bump_status_version()
+        logger.warning("Previous prediction cycle for %s still running — skipping", house_id)
+        return
+    run["running"] = True
+    # Visible as running while it waits for a concurrency slot
+    _bump_status_version()
 
+    try:
+        async with _cycle_semaphore:
+            cycle_start = datetime.now(timezone.utc)
+            due = run.pop("due", None) or _scheduled_slot(house_id, cycle_start)
+            lag = (cycle_start - due).total_seconds()
+            run["last_started"] = cycle_start
+            run["last_lag_seconds"] = round(lag, 1)
+            _bump_status_version()
+            logger.info(
+                "Prediction cycle for %s started at %s (%.1fs after its slot)",
+                house_id,
+                cycle_start.isoformat(),
+                lag,
+            )
+            await _predict_house(house_id, cycle_start)
+            run["last_duration_seconds"] = round(
+                (datetime.now(timezone.utc) - cycle_start).total_seconds(), 2
+            )
+    finally:
+        run["running"] = False
+        _bump_status_version()
+
+
+async def _predict_house(house_id: str, cycle_start: datetime):
     try:
         # 1. Fetch sensor history from Calculus API
         logger.info("Fetching sensor data...")
-        sensor_df = await sensor_client.fetch_sensor_data()
+        sensor_df = await sensor_client.fetch_sensor_data(house_id=house_id)
 
         if sensor_df.empty:
-            logger.error("No sensor data retrieved — skipping prediction")
+            logger.error("No sensor data retrieved for %s — skipping prediction", house_id)
             return
 
         # 2. Push sensor data to server
         logger.info("Pushing sensor data to server...")
         try:
-            await twin_client.push_sensor_data(settings.HOUSE_ID, sensor_df)
+            await twin_client.push_sensor_data(house_id, sensor_df)
         except Exception:
             logger.exception("Failed to push sensor data — continuing with prediction")
 
         # 3. Run ML prediction
         logger.info("Running prediction model...")
-        result = predictor.predict(sensor_df)
+        result = predictor.predict(sensor_df, house_id)
+        try:
+            tracker.record_forecast(house_id, result)
+        except Exception:
+            logger.exception("Recording forecast of %s for accuracy tracking failed", house_id)
 
         # 4. Push prediction results to server
         logger.info("Pushing prediction to server...")
-        await twin_client.push_prediction(settings.HOUSE_ID, result)
+        await twin_client.push_prediction(house_id, result)
 
-        last_prediction_time = datetime.now(timezone.utc)
-        last_prediction_result = result
+        finished = datetime.now(timezone.utc)
+        last_prediction_times[house_id] = finished
+        last_prediction_results[house_id] = result
+        broadcaster.publish(house_id, result)
 
-        elapsed = (last_prediction_time - cycle_start).total_seconds()
+        elapsed = (finished - cycle_start).total_seconds()
         logger.info(
-            "Prediction cycle completed in %.2fs — %d rooms predicted",
+            "Prediction cycle for %s completed in %.2fs — %d rooms predicted",
+            house_id,
             elapsed,
             len(result.get("rooms", {})),
         )
 
     except Exception:
-        logger.exception("Prediction cycle failed")
+        logger.exception("Prediction cycle for %s failed", house_id)
 
 
-def start_scheduler():
-    """Configure and start the APScheduler."""
-    scheduler.add_job(
-        run_prediction_cycle,
-        trigger=IntervalTrigger(minutes=settings.PREDICTION_INTERVAL_MINUTES),
-        id="prediction_cycle",
-        name="ML Prediction Cycle",
-        replace_existing=True,
+def _on_job_submitted(event):
+    if not event.job_id.startswith(_JOB_PREFIX):
+        return
+    run = _house_runs.setdefault(event.job_id.removeprefix(_JOB_PREFIX), {"skipped_runs": 0})
+    # Jittered fire time, so the reported lag excludes the intended jitter delay
+    run["due"] = event.scheduled_run_times[-1]
+
+
+def _on_max_instances(event):
+    house_id = event.job_id.removeprefix(_JOB_PREFIX)
+    run = _house_runs.setdefault(house_id, {"skipped_runs": 0})
+    run["skipped_runs"] += 1
+    _bump_status_version()
+    logger.warning("Prediction cycle for %s still running at its next slot — skipped", house_id)
+
+
+def _schedule_config() -> tuple:
+    return (
+        tuple(settings.house_ids),
+        _interval_seconds(),
+        settings.PREDICTION_JITTER_SECONDS,
+        settings.MAX_CONCURRENT_CYCLES,
     )
+
+
+def _schedule_jobs():
+    """Add (or replace) one staggered prediction job per house and drop jobs of removed houses."""
+    global _scheduled_config
+    interval = _interval_seconds()
+    jitter = settings.PREDICTION_JITTER_SECONDS or None
+
+    for job in scheduler.get_jobs():
+        if job.id.startswith(_JOB_PREFIX) and job.id.removeprefix(_JOB_PREFIX) not in settings.house_ids:
+            job.remove()
+            logger.info("Unscheduled %s", job.id.removeprefix(_JOB_PREFIX))
+
+    for house_id in settings.house_ids:
+        offset = house_phase_offset(house_id, interval)
+        scheduler.add_job(
+            run_prediction_cycle,
+            trigger=IntervalTrigger(
+                seconds=interval,
+                start_date=_SCHEDULE_ANCHOR + timedelta(seconds=offset),
+                jitter=jitter,
+            ),
+            args=[house_id],
+            id=f"{_JOB_PREFIX}{house_id}",
+            name=f"ML Prediction Cycle ({house_id})",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+        )
+        logger.info("Scheduled %s at +%ds within each interval", house_id, offset)
+    _scheduled_config = _schedule_config()
+
+
+def reschedule_jobs():
+    """Re-create the jobs and concurrency limit when a settings refresh changed them."""
+    global _cycle_semaphore
+    if not scheduler.running or _schedule_config() == _scheduled_config:
+        return
+    # Cycles already holding a slot finish under the old limit; new ones use this one
+    _cycle_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_CYCLES)
+    _schedule_jobs()
+    _bump_status_version()
+    logger.info(
+        "Rescheduled — %d house(s) every %d minutes, at most %d concurrent cycles",
+        len(settings.house_ids),
+        settings.PREDICTION_INTERVAL_MINUTES,
+        settings.MAX_CONCURRENT_CYCLES,
+    )
+
+
+def start_scheduler():
+    """Schedule one staggered prediction job per house and start the APScheduler."""
+    _schedule_jobs()
+    scheduler.add_listener(_on_max_instances, EVENT_JOB_MAX_INSTANCES)
+    scheduler.add_listener(_on_job_submitted, EVENT_JOB_SUBMITTED)
     scheduler.start()
+
+    # Secrets refresh in a background thread; reschedule on the event loop
+    loop = asyncio.get_running_loop()
+    add_refresh_listener(lambda: loop.call_soon_threadsafe(reschedule_jobs))
+
+    _bump_status_version()
     logger.info(
-        "Scheduler started — running every %d minutes",
+        "Scheduler started — %d house(s) every %d minutes, at most %d concurrent cycles",
+        len(settings.house_ids),
         settings.PREDICTION_INTERVAL_MINUTES,
+        settings.MAX_CONCURRENT_CYCLES,
     )
 
 
@@ -81,20 +253,61 @@ def stop_scheduler():
     """Shut down the scheduler gracefully."""
     if scheduler.running:
         scheduler.shutdown(wait=False)
+        _bump_status_version()
         logger.info("Scheduler stopped")
 
 
-def get_status() -> dict:
-    """Return scheduler and last prediction status."""
-    job = scheduler.get_job("prediction_cycle")
-    next_run = job.next_run_time.isoformat() if job and job.next_run_time else None
+def _isoformat(dt: datetime | None) -> str | None:
+    return dt.isoformat() if dt else None
 
+
+def get_house_status(house_id: str) -> dict:
+    job = scheduler.get_job(f"{_JOB_PREFIX}{house_id}")
+    run = _house_runs.get(house_id, {})
     return {
-        "scheduler_running": scheduler.running,
-        "prediction_interval_minutes": settings.PREDICTION_INTERVAL_MINUTES,
-        "last_prediction_time": (
-            last_prediction_time.isoformat() if last_prediction_time else None
-        ),
-        "next_scheduled_run": next_run,
-        "last_prediction_result": last_prediction_result,
+        "phase_offset_seconds": house_phase_offset(house_id, _interval_seconds()),
+        "next_run": _isoformat(job.next_run_time if job else None),
+        "running": run.get("running", False),
+        "last_started": _isoformat(run.get("last_started")),
+        "last_lag_seconds": run.get("last_lag_seconds"),
+        "last_duration_seconds": run.get("last_duration_seconds"),
+        "skipped_runs": run.get("skipped_runs", 0),
+        "last_prediction_time": _isoformat(last_prediction_times.get(house_id)),
     }
+
+
+def get_status(fields: set[str] | None = None) -> dict:
+    """Return scheduler and last prediction status, optionally only the given fields."""
+    if fields is None:
+        fields = set(STATUS_FIELDS)
+
+    latest_house = max(last_prediction_times, key=last_prediction_times.get, default=None)
+
+    status = {}
+    if "scheduler_running" in fields:
+        status["scheduler_running"] = scheduler.running
+    if "prediction_interval_minutes" in fields:
+        status["prediction_interval_minutes"] = settings.PREDICTION_INTERVAL_MINUTES
+    if "max_concurrent_cycles" in fields:
+        status["max_concurrent_cycles"] = settings.MAX_CONCURRENT_CYCLES
+    if "last_prediction_time" in fields:
+        status["last_prediction_time"] = _isoformat(last_prediction_times.get(latest_house))
+    if "next_scheduled_run" in fields or "houses" in fields:
+        houses = {house_id: get_house_status(house_id) for house_id in settings.house_ids}
+        if "next_scheduled_run" in fields:
+            next_runs = [h["next_run"] for h in houses.values() if h["next_run"]]
+            status["next_scheduled_run"] = min(next_runs) if next_runs else None
+        if "houses" in fields:
+            status["houses"] = houses
+    if "last_prediction_result" in fields:
+        status["last_prediction_result"] = last_prediction_results.get(latest_house)
+    return status
+
+
+def get_status_watermark() -> tuple:
+    """Identify the current status content: version, prediction time and data watermark."""
+    latest_prediction = max(last_prediction_times.values(), default=None)
+    data_watermark = max(
+        (r.get("base_time", "") for r in last_prediction_results.values()), default=None
+    )
+    return _status_version, _isoformat(latest_prediction), data_watermark
@@ -0,0 +1,35 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_process_start = time.perf_counter()
+_phases: dict[str, float] = {}
+_ready_ms: float | None = None
+
+
+@contextmanager
+def timed_phase(name: str):
+    """Time a startup phase (or a deferred one like the first model import)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _phases[name] = round(elapsed_ms, 1)
+        logger.info("Startup phase %s took %.1f ms", name, elapsed_ms)
+
+
+def mark_ready():
+    """Record the moment the server is ready to accept requests."""
+    global _ready_ms
+    _ready_ms = round((time.perf_counter() - _process_start) * 1000, 1)
+    logger.info("Server ready %.1f ms after import", _ready_ms)
+
+
+def get_startup_report() -> dict:
+    return {
+        "ready_ms": _ready_ms,
+        "phases_ms": dict(_phases),
+    }